@@ -7,6 +7,7 @@ Authors
 """
 
 import os
+import re
 import csv
 import logging
 import torchaudio
@@ -15,6 +16,9 @@ from speechbrain.utils.parallel import parallel_map
 
 logger = logging.getLogger(__name__)
 
+# TED-LIUM separates contractions from their stem (e.g. "we 've")
+CONTRACTION_REGEX = re.compile(r" '(ve|t|ll|d|m|re|s)")
+
 
 def make_splits(
     sph_file, stm_file, utt_save_folder, avoid_if_shorter_than,
@@ -67,18 +71,15 @@ def make_splits(
         wrd_list = line[6:]
         if wrd_list[-1] == "":
             wrd_list = wrd_list[:-1]
+        # skip invalid transcriptions (e.g. ignore_time_segment_in_scoring)
+        # before doing any string processing on them
+        if len(wrd_list) <= 1:
+            continue
         transcript = " ".join(wrd_list)
         if not transcript[-1].isalpha():
             transcript = transcript[:-1]
-        transcript = transcript.replace(" 've", "'ve")
-        transcript = transcript.replace(" 't", "'t")
-        transcript = transcript.replace(" 'll", "'ll")
-        transcript = transcript.replace(" 'd", "'d")
-        transcript = transcript.replace(" 'm", "'m")
-        transcript = transcript.replace(" 're", "'re")
-        transcript = transcript.replace(" 's", "'s")
-        # skip invalid transcriptions
-        if len(wrd_list) <= 1 or transcript == "ignore_time_segment_in_scoring":
+        transcript = CONTRACTION_REGEX.sub(r"'\1", transcript)
+        if transcript == "ignore_time_segment_in_scoring":
             continue
 
         # clip and save the current utterance
@@ -88,9 +89,9 @@ def make_splits(
 
         # we avoid duplicated clip and save
         if not os.path.exists(clipped_save_path):
-            start = float(line[3]) * sample_rate
-            end = float(line[4]) * sample_rate
-            curr_utt = original_speech[:, int(start) : int(end)]
+            start_frame = int(start * sample_rate)
+            end_frame = int(end * sample_rate)
+            curr_utt = original_speech[:, start_frame:end_frame]
             torchaudio.save(clipped_save_path, curr_utt, sample_rate)
         # append to the csv entry list
         csv_line = [
@@ -113,7 +113,7 @@ class CTCPrefixScore:
 
             # Accumulate blank posteriors at each step
             r_prev[:, 1] = torch.cumsum(
-                self.x[0, :, :, self.blank_index], 0
+                self.x[0, :, :, self.blank_index], 0, dtype=r_prev.dtype
             ).unsqueeze(2)
             r_prev = r_prev.view(-1, 2, n_bh)
             psi_prev = torch.full(
@@ -7,10 +7,13 @@ Authors:
 """
 
 import torch
+import logging
 import numpy as np
 import speechbrain as sb
 from speechbrain.decoders.ctc import CTCPrefixScore
 
+logger = logging.getLogger(__name__)
+
 
 class BaseScorerInterface:
     """A scorer abstraction to be inherited by other
@@ -40,6 +43,15 @@ class BaseScorerInterface:
         - speechbrain.decoders.scorer.LengthScorer
     """
 
+    # Name of the scorer in the weights of the ScorerBuilder, set by
+    # register_scorer. If None, it is derived from the class name.
+    SCORER_KEY = None
+
+    # Whether score() only returns the scores of the given candidates, i.e.
+    # a (batch_size x beam_size, scorer_beam_size) tensor aligned with them.
+    # The tokens outside the candidates are then pruned by the ScorerBuilder.
+    returns_pruned = False
+
     def score(self, inp_tokens, memory, candidates, attn):
         """This method scores the new beams based on the
         informations of the current timestep.
@@ -69,6 +81,14 @@ class BaseScorerInterface:
         ---------
         torch.Tensor
             (batch_size x beam_size, vocab_size), Scores for the next tokens.
+            Scores that do not depend on the token may be returned as
+            (batch_size x beam_size, 1) and are broadcast over the vocabulary.
+            If returns_pruned is True and candidates are given, the shape is
+            (batch_size x beam_size, scorer_beam_size) instead.
+            They are accumulated into log-probabilities that may be float16
+            or bfloat16. Pruned scores are clamped to the range of that
+            dtype, other scores below it (e.g. -1e20 in float16) overflow
+            to -inf.
         memory : No limit
             The memory variables input for this timestep.
         """
@@ -103,6 +123,34 @@ class BaseScorerInterface:
         return None
 
 
+# Scorers that can be used in a ScorerBuilder, indexed by their SCORER_KEY
+SCORER_REGISTRY = {}
+
+
+def register_scorer(name):
+    """Class decorator registering a scorer, so that a ScorerBuilder accepts
+    a weight for it.
+
+    Arguments
+    ---------
+    name : str
+        The name of the scorer in the weights of the ScorerBuilder.
+
+    Returns
+    -------
+    decorator : callable
+        Registers the decorated scorer class under the given name.
+    """
+
+    def decorator(cls):
+        cls.SCORER_KEY = name
+        SCORER_REGISTRY[name] = cls
+        return cls
+
+    return decorator
+
+
+@register_scorer("ctc")
 class CTCScorer(BaseScorerInterface):
     """A wrapper of CTCPrefixScore based on the BaseScorerInterface.
 
@@ -124,6 +172,12 @@ class CTCScorer(BaseScorerInterface):
     ctc_window_size : int
         Compute the ctc scores over the time frames using windowing
         based on attention peaks. If 0, no windowing applied. (default: 0)
+    dtype : torch.dtype
+        The dtype used to store the CTC posteriors during decoding, either
+        torch.float32 or torch.bfloat16. Using torch.bfloat16 halves the
+        memory read at each prefix scoring step. torch.float16 is rejected,
+        as it cannot represent the masking value of CTCPrefixScore.
+        (default: torch.float32)
 
     Example
     -------
@@ -169,13 +223,22 @@ class CTCScorer(BaseScorerInterface):
     """
 
     def __init__(
-        self, ctc_fc, blank_index, eos_index, ctc_window_size=0,
+        self,
+        ctc_fc,
+        blank_index,
+        eos_index,
+        ctc_window_size=0,
+        dtype=torch.float32,
     ):
+        if dtype not in (torch.float32, torch.bfloat16):
+            raise ValueError(
+                f"dtype should be torch.float32 or torch.bfloat16, got {dtype}"
+            )
         self.ctc_fc = ctc_fc
         self.blank_index = blank_index
         self.eos_index = eos_index
         self.ctc_window_size = ctc_window_size
-        self.softmax = sb.nnet.activations.Softmax(apply_log=True)
+        self.dtype = dtype
 
     def score(self, inp_tokens, memory, candidates, attn):
         """This method scores the new beams based on the
@@ -230,13 +293,15 @@ class CTCScorer(BaseScorerInterface):
             The speechbrain-style relative length.
         """
         logits = self.ctc_fc(x)
-        x = self.softmax(logits)
+        x = torch.log_softmax(logits, dim=-1, dtype=torch.float32)
+        x = x.to(self.dtype)
         self.ctc_score = CTCPrefixScore(
             x, enc_lens, self.blank_index, self.eos_index, self.ctc_window_size
         )
         return None
 
 
+@register_scorer("rnnlm")
 class RNNLMScorer(BaseScorerInterface):
     """A wrapper of RNNLM based on BaseScorerInterface.
 
@@ -317,7 +382,7 @@ class RNNLMScorer(BaseScorerInterface):
         self.lm = language_model
         self.lm.eval()
         self.temperature = temperature
-        self.softmax = sb.nnet.activations.Softmax(apply_log=True)
+        self.inv_temperature = 1.0 / temperature
 
     def score(self, inp_tokens, memory, candidates, attn):
         """This method scores the new beams based on the
@@ -336,9 +401,11 @@ class RNNLMScorer(BaseScorerInterface):
         attn : torch.Tensor
             The attention weight to be used in CoverageScorer or CTCScorer.
         """
-        with torch.no_grad():
+        with torch.inference_mode():
             logits, hs = self.lm(inp_tokens, hx=memory)
-            log_probs = self.softmax(logits / self.temperature)
+            if self.inv_temperature != 1.0:
+                logits = logits * self.inv_temperature
+            log_probs = torch.log_softmax(logits, dim=-1, dtype=torch.float32)
         return log_probs, hs
 
     def permute_mem(self, memory, index):
@@ -376,6 +443,7 @@ class RNNLMScorer(BaseScorerInterface):
         return None
 
 
+@register_scorer("transformerlm")
 class TransformerLMScorer(BaseScorerInterface):
     """A wrapper of TransformerLM based on BaseScorerInterface.
 
@@ -390,6 +458,9 @@ class TransformerLMScorer(BaseScorerInterface):
     temperature : float
         Temperature factor applied to softmax. It changes the probability
         distribution, being softer when T>1 and sharper with T<1. (default: 1.0)
+    init_buffer_size : int
+        Initial number of steps preallocated to store the decoded prefix.
+        The buffer is doubled whenever it is full. (default: 32)
 
     Example
     -------
@@ -458,11 +529,14 @@ class TransformerLMScorer(BaseScorerInterface):
     >>> hyps, _, _, _ = searcher(enc, wav_len)
     """
 
-    def __init__(self, language_model, temperature=1.0):
+    def __init__(self, language_model, temperature=1.0, init_buffer_size=32):
+        if init_buffer_size < 1:
+            raise ValueError("init_buffer_size should be >= 1")
         self.lm = language_model
         self.lm.eval()
         self.temperature = temperature
-        self.softmax = sb.nnet.activations.Softmax(apply_log=True)
+        self.inv_temperature = 1.0 / temperature
+        self.init_buffer_size = init_buffer_size
 
     def score(self, inp_tokens, memory, candidates, attn):
         """This method scores the new beams based on the
@@ -481,18 +555,31 @@ class TransformerLMScorer(BaseScorerInterface):
         attn : torch.Tensor
             The attention weight to be used in CoverageScorer or CTCScorer.
         """
-        with torch.no_grad():
+        with torch.inference_mode():
             if memory is None:
-                memory = torch.empty(
-                    inp_tokens.size(0), 0, device=inp_tokens.device
+                memory = (
+                    inp_tokens.new_empty(
+                        inp_tokens.size(0), self.init_buffer_size
+                    ),
+                    0,
+                )
+            token_buffer, length = memory
+            # Double the preallocated buffer when it is full, so that the
+            # prefix is copied O(log T) times instead of at every step.
+            if length == token_buffer.size(1):
+                token_buffer = torch.cat(
+                    [token_buffer, torch.empty_like(token_buffer)], dim=-1
                 )
             # Append the predicted token of the previous step to existing memory.
-            memory = torch.cat([memory, inp_tokens.unsqueeze(1)], dim=-1)
-            if not next(self.lm.parameters()).is_cuda:
-                self.lm.to(inp_tokens.device)
-            logits = self.lm(memory)
-            log_probs = self.softmax(logits / self.temperature)
-        return log_probs[:, -1, :], memory
+            token_buffer[:, length] = inp_tokens
+            length += 1
+            logits = self.lm(token_buffer[:, :length])
+            # Only the prediction of the last position is needed
+            logits = logits[:, -1, :]
+            if self.inv_temperature != 1.0:
+                logits = logits * self.inv_temperature
+            log_probs = torch.log_softmax(logits, dim=-1, dtype=torch.float32)
+        return log_probs, (token_buffer, length)
 
     def permute_mem(self, memory, index):
         """This method permutes the scorer memory to synchronize
@@ -506,12 +593,13 @@ class TransformerLMScorer(BaseScorerInterface):
         index : torch.Tensor
             (batch_size, beam_size). The index of the previous path.
         """
-        memory = torch.index_select(memory, dim=0, index=index)
-        return memory
+        token_buffer, length = memory
+        token_buffer = torch.index_select(token_buffer, dim=0, index=index)
+        return token_buffer, length
 
     def reset_mem(self, x, enc_lens):
         """This method implement the resetting of
-        memory variables for the RNNLM scorer.
+        memory variables for the TransformerLM scorer.
 
         Arguments
         ---------
@@ -521,9 +609,13 @@ class TransformerLMScorer(BaseScorerInterface):
         enc_lens : torch.Tensor
             The speechbrain-style relative length.
         """
+        # Check the device of the LM once per utterance, not at every step
+        if not next(self.lm.parameters()).is_cuda:
+            self.lm.to(x.device)
         return None
 
 
+@register_scorer("kenlm")
 class KenLMScorer(BaseScorerInterface):
     """KenLM N-gram scorer.
 
@@ -604,6 +696,9 @@ class KenLMScorer(BaseScorerInterface):
     # >>> hyps, _, _, _ = searcher(enc, wav_len)
     """
 
+    # Only the candidates are scored, no need to send vocab-sized scores
+    returns_pruned = True
+
     def __init__(self, lm_path, vocab_size, token_list):
         try:
             import kenlm
@@ -646,34 +741,46 @@ class KenLMScorer(BaseScorerInterface):
         scale = 1.0 / np.log10(np.e)
 
         if memory is None:
-            state = self.kenlm.State()
-            state = np.array([state] * n_bh)
-            scoring_table = np.ones(n_bh)
+            state = [self.kenlm.State()] * n_bh
         else:
-            state, scoring_table = memory
+            state = memory
 
         # Perform full scorer mode, not recommend
         if candidates is None:
             candidates = [self.full_candidates] * n_bh
-
-        # Store new states and scores
-        scores = np.ones((n_bh, self.vocab_size)) * self.minus_inf
-        new_memory = np.zeros((n_bh, self.vocab_size), dtype=object)
-        new_scoring_table = np.ones((n_bh, self.vocab_size)) * -1
+        else:
+            # Move the candidates to host memory once, instead of
+            # synchronizing on every single token_id in the loop below
+            candidates = candidates.cpu().numpy()
+
+        # Store the score of each candidate (in full scorer mode, the
+        # candidates are the whole vocabulary in order), and the states of
+        # the scored tokens only.
+        # float32 so that the final conversion to torch is zero-copy
+        scores = np.full(
+            (n_bh, len(candidates[0])), self.minus_inf, dtype=np.float32
+        )
+        new_memory = [dict() for _ in range(n_bh)]
+        # Local aliases avoid attribute lookups in the inner loop
+        id2char = self.id2char
+        base_score = self.lm.BaseScore
+        new_state = self.kenlm.State
         # Scoring
         for i in range(n_bh):
-            if scoring_table[i] == -1:
-                continue
             parent_state = state[i]
-            for token_id in candidates[i]:
-                char = self.id2char[token_id.item()]
-                out_state = self.kenlm.State()
-                score = scale * self.lm.BaseScore(parent_state, char, out_state)
-                scores[i, token_id] = score
-                new_memory[i, token_id] = out_state
-                new_scoring_table[i, token_id] = 1
-        scores = torch.from_numpy(scores).float().to(inp_tokens.device)
-        return scores, (new_memory, new_scoring_table)
+            # The prefix of this hypothesis was not scored at the previous step
+            if parent_state is None:
+                continue
+            row_scores = scores[i]
+            row_memory = new_memory[i]
+            for j, token_id in enumerate(candidates[i].tolist()):
+                out_state = new_state()
+                row_scores[j] = scale * base_score(
+                    parent_state, id2char[token_id], out_state
+                )
+                row_memory[token_id] = out_state
+        scores = torch.from_numpy(scores).to(inp_tokens.device)
+        return scores, new_memory
 
     def permute_mem(self, memory, index):
         """This method permutes the scorer memory to synchronize
@@ -687,24 +794,20 @@ class KenLMScorer(BaseScorerInterface):
         index : torch.Tensor
             (batch_size, beam_size). The index of the previous path.
         """
-        state, scoring_table = memory
-
         index = index.cpu().numpy()
         # The first index of each sentence.
         beam_size = index.shape[1]
         beam_offset = self.batch_index * beam_size
-        hyp_index = (
-            index
-            + np.broadcast_to(np.expand_dims(beam_offset, 1), index.shape)
-            * self.vocab_size
-        )
-        hyp_index = hyp_index.reshape(-1)
-        # Update states
-        state = state.reshape(-1)
-        state = state[hyp_index]
-        scoring_table = scoring_table.reshape(-1)
-        scoring_table = scoring_table[hyp_index]
-        return state, scoring_table
+        # The hypothesis (at batch * beam dimension) and the token of each
+        # top-K candidate.
+        hyp_index = (index // self.vocab_size + beam_offset[:, None]).ravel()
+        token_index = (index % self.vocab_size).ravel()
+        # Update states, a token that was not scored gives a None state
+        state = [
+            memory[h].get(t)
+            for h, t in zip(hyp_index.tolist(), token_index.tolist())
+        ]
+        return state
 
     def reset_mem(self, x, enc_lens):
         """This method implement the resetting of
@@ -724,6 +827,7 @@ class KenLMScorer(BaseScorerInterface):
         return None
 
 
+@register_scorer("coverage")
 class CoverageScorer(BaseScorerInterface):
     """A coverage penalty scorer to prevent looping of hyps,
     where ```coverage``` is the cumulative attention probability vector.
@@ -828,23 +932,23 @@ class CoverageScorer(BaseScorerInterface):
         n_bh = attn.size(0)
         self.time_step += 1
 
-        if coverage is None:
-            coverage = torch.zeros_like(attn, device=attn.device)
-
         # Current coverage
         if len(attn.size()) > 2:
             # the attn of transformer is [batch_size x beam_size, current_step, source_len]
             coverage = torch.sum(attn, dim=1)
+        elif coverage is None:
+            # first step, the coverage starts from zero
+            coverage = attn
         else:
             coverage = coverage + attn
 
         # Compute coverage penalty and add it to scores
-        penalty = torch.max(
-            coverage, coverage.clone().fill_(self.threshold)
-        ).sum(-1)
-        penalty = penalty - coverage.size(-1) * self.threshold
-        penalty = penalty.view(n_bh).unsqueeze(1).expand(-1, self.vocab_size)
-        return -1 * penalty / self.time_step, coverage
+        # sum(max(c, threshold)) - len(c) * threshold == sum(relu(c - threshold))
+        penalty = torch.clamp(coverage - self.threshold, min=0).sum(-1)
+        # The penalty is the same for every token of a hypothesis, return it
+        # as (batch_size x beam_size, 1) and let it broadcast over the vocab.
+        penalty = penalty.view(n_bh, 1)
+        return -penalty / self.time_step, coverage
 
     def permute_mem(self, coverage, index):
         """This method permutes the scorer memory to synchronize
@@ -878,6 +982,7 @@ class CoverageScorer(BaseScorerInterface):
         return None
 
 
+@register_scorer("length")
 class LengthScorer(BaseScorerInterface):
     """A length rewarding scorer.
 
@@ -1094,18 +1199,14 @@ class ScorerBuilder:
         ), "Weights and scorers are not matched."
 
         self.scorer_beam_scale = scorer_beam_scale
-        all_scorer_names = [
-            k.lower().split("scorer")[0]
-            for k in globals().keys()
-            if k.endswith("Scorer")
-        ]
-        full_scorer_names = [
-            impl.__class__.__name__.lower().split("scorer")[0]
-            for impl in full_scorers
-        ]
+        self.minus_inf = -1e20
+        # Number of candidates given to the partial scorers, see set_beam_size
+        self._beam_size = None
+        self._partial_k = None
+        all_scorer_names = list(SCORER_REGISTRY)
+        full_scorer_names = [self._scorer_key(impl) for impl in full_scorers]
         partial_scorer_names = [
-            impl.__class__.__name__.lower().split("scorer")[0]
-            for impl in partial_scorers
+            self._scorer_key(impl) for impl in partial_scorers
         ]
 
         # Have a default 0.0 weight for scorer not specified
@@ -1113,10 +1214,55 @@ class ScorerBuilder:
         self.weights = {**init_weights, **weights}
         self.full_scorers = dict(zip(full_scorer_names, full_scorers))
         self.partial_scorers = dict(zip(partial_scorer_names, partial_scorers))
+        self._ctc_weight = float(self.weights.get("ctc", 0.0))
+        self._coverage_weight = float(self.weights.get("coverage", 0.0))
 
         # Check if scorers are valid
         self._validate_scorer(all_scorer_names)
 
+        # The blank token is blocked when CTC is a full scorer, even when its
+        # weight is 0.0 and it is not run
+        self._ctc_blank_index = (
+            self.full_scorers["ctc"].blank_index
+            if "ctc" in self.full_scorers
+            else None
+        )
+
+        # Besides the blank masking above, a scorer with a 0.0 weight cannot
+        # change the results, do not run it
+        for scorers in (self.full_scorers, self.partial_scorers):
+            for k in [k for k in scorers if self.weights[k] == 0.0]:
+                logger.info("Scorer %s has weight 0.0, disabling it.", k)
+                del scorers[k]
+
+        # Fix the iteration order and the weights used at every decoding step.
+        # The scorer memories are stored in a list, at the position of their
+        # scorer: full scorers first, then partial scorers.
+        self._full_items = tuple(
+            (i, k, impl, self.weights[k])
+            for i, (k, impl) in enumerate(self.full_scorers.items())
+        )
+        self._partial_items = tuple(
+            (i, k, impl, self.weights[k])
+            for i, (k, impl) in enumerate(
+                self.partial_scorers.items(), start=len(self._full_items)
+            )
+        )
+        # All scorers, in the order of their memories
+        self._all_items = self._full_items + self._partial_items
+        # ctc and kenlm memories are synchronized with the top-K candidates,
+        # as are the memories of all partial scorers
+        self._permute_by_candidates = tuple(
+            (i, impl)
+            for i, k, impl, _ in self._full_items
+            if k in ("ctc", "kenlm")
+        ) + tuple((i, impl) for i, _, impl, _ in self._partial_items)
+        self._permute_by_index = tuple(
+            (i, impl)
+            for i, k, impl, _ in self._full_items
+            if k not in ("ctc", "kenlm")
+        )
+
     def score(self, inp_tokens, memory, attn, log_probs, beam_size):
         """This method scores tokens in vocabulary based on defined full scorers
         and partial scorers. Scores will be added to the log probs for beamsearch.
@@ -1125,12 +1271,13 @@ class ScorerBuilder:
         ---------
         inp_tokens : torch.Tensor
             See BaseScorerInterface().
-        memory : dict[str, scorer memory]
+        memory : list[scorer memory]
             The states of scorers for this timestep.
         attn : torch.Tensor
             See BaseScorerInterface().
         log_probs : torch.Tensor
             (batch_size x beam_size, vocab_size). The log probs at this timestep.
+            It may be float32, float16 or bfloat16, and is updated in place.
         beam_size : int
             The beam size.
 
@@ -1138,33 +1285,129 @@ class ScorerBuilder:
         ---------
         log_probs : torch.Tensor
             (batch_size x beam_size, vocab_size). Log probs updated by scorers.
-        new_memory : dict[str, scorer memory]
+        new_memory : list[scorer memory]
             The updated states of scorers.
         """
-        new_memory = dict()
+        minus_inf = self._minus_inf(log_probs)
+        self._mask_ctc_blank(log_probs, minus_inf)
+
+        new_memory = [None] * len(memory)
         # score full candidates
-        for k, impl in self.full_scorers.items():
-            if k == "ctc":
-                # block blank token if CTC is used
-                log_probs[:, impl.blank_index] = impl.ctc_score.minus_inf
+        for i, _, impl, weight in self._full_items:
+            score, new_memory[i] = impl.score(inp_tokens, memory[i], None, attn)
+            # scale and accumulate in a single kernel, without a temporary
+            log_probs.add_(score, alpha=weight)
 
-            score, new_memory[k] = impl.score(inp_tokens, memory[k], None, attn)
-            log_probs += score * self.weights[k]
+        if not self._partial_items:
+            # no need for candidates
+            return log_probs, new_memory
 
-        # select candidates from the results of full scorers for partial scorers
-        _, candidates = log_probs.topk(
-            int(beam_size * self.scorer_beam_scale), dim=-1
-        )
+        candidates = self._select_candidates(log_probs, beam_size)
 
         # score pruned tokens candidates
-        for k, impl in self.partial_scorers.items():
-            score, new_memory[k] = impl.score(
-                inp_tokens, memory[k], candidates, attn
+        for i, _, impl, weight in self._partial_items:
+            score, new_memory[i] = impl.score(
+                inp_tokens, memory[i], candidates, attn
+            )
+            self._add_partial_score(
+                log_probs, impl, score, weight, candidates, minus_inf
             )
-            log_probs += score * self.weights[k]
 
         return log_probs, new_memory
 
+    def _minus_inf(self, log_probs):
+        """Returns the masking value, clamped to the range of the dtype of
+        log_probs (-1e20 overflows to -inf in float16).
+
+        Arguments
+        ---------
+        log_probs : torch.Tensor
+            The log probs at this timestep.
+
+        Returns
+        -------
+        float
+            The masking value.
+        """
+        return max(self.minus_inf, torch.finfo(log_probs.dtype).min)
+
+    def _mask_ctc_blank(self, log_probs, minus_inf):
+        """Blocks the blank token if CTC is a full scorer.
+
+        Arguments
+        ---------
+        log_probs : torch.Tensor
+            (batch_size x beam_size, vocab_size). The log probs at this timestep.
+        minus_inf : float
+            The masking value.
+        """
+        if self._ctc_blank_index is not None:
+            log_probs[:, self._ctc_blank_index] = minus_inf
+
+    def _select_candidates(self, log_probs, beam_size):
+        """Selects the candidates from the results of full scorers for the
+        partial scorers.
+
+        Arguments
+        ---------
+        log_probs : torch.Tensor
+            (batch_size x beam_size, vocab_size). The log probs at this timestep.
+        beam_size : int
+            The beam size.
+
+        Returns
+        -------
+        candidates : torch.Tensor
+            (batch_size x beam_size, scorer_beam_size). The top-k tokens.
+        """
+        if beam_size != self._beam_size:
+            self.set_beam_size(beam_size)
+        # the order of the candidates does not matter to partial scorers
+        _, candidates = log_probs.topk(self._partial_k, dim=-1, sorted=False)
+        return candidates
+
+    def _add_partial_score(
+        self, log_probs, impl, score, weight, candidates, minus_inf
+    ):
+        """Accumulates the weighted scores of a partial scorer in place.
+
+        Arguments
+        ---------
+        log_probs : torch.Tensor
+            (batch_size x beam_size, vocab_size). The log probs at this timestep.
+        impl : BaseScorerInterface
+            The partial scorer.
+        score : torch.Tensor
+            The scores returned by the partial scorer.
+        weight : float
+            The weight of the partial scorer.
+        candidates : torch.Tensor
+            (batch_size x beam_size, scorer_beam_size). The scored candidates.
+        minus_inf : float
+            The masking value.
+        """
+        if impl.returns_pruned:
+            # only the candidates are scored, prune the other tokens
+            score = log_probs.gather(1, candidates).add_(score, alpha=weight)
+            # a candidate overflowing to -inf (e.g. -1e20 in float16) would
+            # otherwise rank below the pruned tokens
+            score.clamp_(min=minus_inf)
+            log_probs.fill_(minus_inf).scatter_(1, candidates, score)
+        else:
+            log_probs.add_(score, alpha=weight)
+
+    def set_beam_size(self, beam_size):
+        """Sets the beam size, and computes the number of candidates given to
+        the partial scorers at each step once for the whole decoding.
+
+        Arguments
+        ---------
+        beam_size : int
+            The beam size.
+        """
+        self._beam_size = beam_size
+        self._partial_k = int(beam_size * self.scorer_beam_scale)
+
     def permute_scorer_mem(self, memory, index, candidates):
         """Update memory variables of scorers to synchronize
         the memory index with the current output and perform
@@ -1172,21 +1415,17 @@ class ScorerBuilder:
 
         Arguments
         ---------
-        memory : dict[str, scorer memory]
+        memory : list[scorer memory]
             The states of scorers for this timestep.
         index : torch.Tensor
             (batch_size x beam_size). The index of the previous path.
         candidates : torch.Tensor
             (batch_size, beam_size). The index of the topk candidates.
         """
-        for k, impl in self.full_scorers.items():
-            # ctc scorer should always be scored by candidates
-            if k == "ctc" or k == "kenlm":
-                memory[k] = impl.permute_mem(memory[k], candidates)
-                continue
-            memory[k] = impl.permute_mem(memory[k], index)
-        for k, impl in self.partial_scorers.items():
-            memory[k] = impl.permute_mem(memory[k], candidates)
+        for i, impl in self._permute_by_index:
+            memory[i] = impl.permute_mem(memory[i], index)
+        for i, impl in self._permute_by_candidates:
+            memory[i] = impl.permute_mem(memory[i], candidates)
         return memory
 
     def reset_scorer_mem(self, x, enc_lens):
@@ -1199,10 +1438,42 @@ class ScorerBuilder:
         wav_len : torch.Tensor
             See BaseScorerInterface().
         """
-        memory = dict()
-        for k, impl in {**self.full_scorers, **self.partial_scorers}.items():
-            memory[k] = impl.reset_mem(x, enc_lens)
-        return memory
+        return [
+            impl.reset_mem(x, enc_lens) for _, _, impl, _ in self._all_items
+        ]
+
+    def named_memory(self, memory):
+        """Returns a view of the scorer memory indexed by scorer name.
+
+        Arguments
+        ---------
+        memory : list[scorer memory]
+            The states of scorers, as returned by reset_scorer_mem().
+
+        Returns
+        -------
+        dict[str, scorer memory]
+            The states of scorers, indexed by scorer name.
+        """
+        return {k: memory[i] for i, k, _, _ in self._all_items}
+
+    @staticmethod
+    def _scorer_key(impl):
+        """Returns the name of a scorer in the weights, see SCORER_KEY.
+
+        Arguments
+        ---------
+        impl : BaseScorerInterface
+            The scorer.
+
+        Returns
+        -------
+        str
+            The name of the scorer.
+        """
+        if getattr(impl, "SCORER_KEY", None) is not None:
+            return impl.SCORER_KEY
+        return impl.__class__.__name__.lower().split("scorer")[0]
 
     def _validate_scorer(self, scorer_names):
         """These error messages indicate scorers are not properly set.
@@ -1217,15 +1488,15 @@ class ScorerBuilder:
                 "The keys of weights should be named in {}".format(scorer_names)
             )
 
-        if not 0.0 <= self.weights["ctc"] <= 1.0:
+        if not 0.0 <= self._ctc_weight <= 1.0:
             raise ValueError("ctc_weight should not > 1.0 and < 0.0")
 
-        if self.weights["ctc"] == 1.0:
+        if self._ctc_weight == 1.0:
             if "ctc" not in self.full_scorers.keys():
                 raise ValueError(
                     "CTC scorer should be a full scorer when it's weight is 1.0"
                 )
-            if self.weights["coverage"] > 0.0:
+            if self._coverage_weight > 0.0:
                 raise ValueError(
                     "Pure CTC scorer doesn't have attention weights for coverage scorer"
                 )
@@ -0,0 +1,360 @@
+import pytest
+
+
+@pytest.fixture
+def register_test_scorer():
+    """Registers scorer classes for a test, and always unregisters them."""
+    from speechbrain.decoders.scorer import SCORER_REGISTRY, register_scorer
+
+    names = []
+
+    def register(name, cls):
+        names.append(name)
+        return register_scorer(name)(cls)
+
+    yield register
+    for name in names:
+        del SCORER_REGISTRY[name]
+
+
+@pytest.fixture
+def pruned_scorer(register_test_scorer):
+    """A registered dummy scorer returning pruned scores, computed from the
+    candidates by the given function."""
+    from speechbrain.decoders.scorer import BaseScorerInterface
+
+    class PrunedScorer(BaseScorerInterface):
+        returns_pruned = True
+
+        def __init__(self, score_fn):
+            self.score_fn = score_fn
+
+        def score(self, inp_tokens, memory, candidates, attn):
+            self.candidates = candidates
+            return self.score_fn(candidates), None
+
+    return register_test_scorer("pruned", PrunedScorer)
+
+
+def test_scorerbuilder_validation():
+    import torch
+    from speechbrain.decoders.scorer import (
+        CTCScorer,
+        LengthScorer,
+        ScorerBuilder,
+    )
+
+    # Scorers without ctc nor coverage weights do not trigger their checks
+    beam_size, vocab_size = 2, 10
+    scorer = ScorerBuilder(
+        full_scorers=[LengthScorer(vocab_size=vocab_size)],
+        weights={"length": 1.0},
+    )
+    memory = scorer.reset_scorer_mem(None, None)
+    log_probs = torch.zeros(beam_size, vocab_size)
+    inp_tokens = torch.zeros(beam_size, dtype=torch.long)
+    log_probs, _ = scorer.score(inp_tokens, memory, None, log_probs, beam_size)
+    assert (log_probs == 1.0).all()
+
+    ctc_scorer = CTCScorer(
+        ctc_fc=torch.nn.Linear(4, 10), blank_index=0, eos_index=2
+    )
+    with pytest.raises(ValueError):
+        ScorerBuilder(partial_scorers=[ctc_scorer], weights={"ctc": 1.0})
+    with pytest.raises(ValueError):
+        ScorerBuilder(full_scorers=[ctc_scorer], weights={"ctc": 1.5})
+
+
+def test_scorerbuilder_length_score():
+    import torch
+    from speechbrain.decoders.scorer import LengthScorer, ScorerBuilder
+
+    vocab_size, beam_size = 10, 2
+    scorer = ScorerBuilder(
+        full_scorers=[LengthScorer(vocab_size=vocab_size)],
+        weights={"length": 0.5},
+    )
+    enc = torch.rand(1, 3, 4)
+    memory = scorer.reset_scorer_mem(enc, torch.ones(1))
+    log_probs = torch.zeros(beam_size, vocab_size)
+    inp_tokens = torch.zeros(beam_size, dtype=torch.long)
+    log_probs, memory = scorer.score(
+        inp_tokens, memory, None, log_probs, beam_size
+    )
+    assert torch.allclose(log_probs, torch.full_like(log_probs, 0.5))
+    assert list(scorer.named_memory(memory)) == ["length"]
+
+
+def test_scorer_registry(register_test_scorer):
+    from speechbrain.decoders.scorer import (
+        SCORER_REGISTRY,
+        BaseScorerInterface,
+        CTCScorer,
+        ScorerBuilder,
+    )
+
+    assert SCORER_REGISTRY["ctc"] is CTCScorer
+    assert CTCScorer.SCORER_KEY == "ctc"
+
+    class DummyScorer(BaseScorerInterface):
+        pass
+
+    register_test_scorer("dummy", DummyScorer)
+    assert DummyScorer.SCORER_KEY == "dummy"
+    scorer = ScorerBuilder(full_scorers=[DummyScorer()], weights={"dummy": 1.0})
+    assert "dummy" in scorer.full_scorers
+
+
+def test_transformerlm_scorer_buffer():
+    import torch
+    from speechbrain.decoders.scorer import TransformerLMScorer
+    from speechbrain.lobes.models.transformer.TransformerLM import (
+        TransformerLM,
+    )
+
+    with pytest.raises(ValueError):
+        TransformerLMScorer(language_model=None, init_buffer_size=0)
+
+    vocab_size, n_hyps, n_steps, temperature = 11, 3, 6, 1.15
+    lm = TransformerLM(
+        vocab=vocab_size,
+        d_model=16,
+        nhead=2,
+        num_encoder_layers=1,
+        d_ffn=32,
+        dropout=0.0,
+    )
+    # A single slot forces the buffer to be doubled during decoding
+    scorer = TransformerLMScorer(
+        language_model=lm, temperature=temperature, init_buffer_size=1
+    )
+    scorer.reset_mem(torch.rand(n_hyps, 4, 16), torch.ones(n_hyps))
+
+    memory, prefix = None, None
+    for _ in range(n_steps):
+        inp_tokens = torch.randint(1, vocab_size, (n_hyps,))
+        log_probs, memory = scorer.score(inp_tokens, memory, None, None)
+
+        # Reference: concatenate the whole prefix at each step
+        token = inp_tokens.unsqueeze(1)
+        prefix = token if prefix is None else torch.cat([prefix, token], -1)
+        with torch.no_grad():
+            logits = lm(prefix)[:, -1, :] / temperature
+        expected = torch.log_softmax(logits, dim=-1)
+        assert torch.allclose(log_probs, expected, atol=1e-5)
+
+        index = torch.randperm(n_hyps)
+        memory = scorer.permute_mem(memory, index)
+        prefix = prefix[index]
+
+
+def test_ctc_scorer_dtype():
+    import torch
+    from speechbrain.decoders.scorer import CTCScorer
+
+    batch_size, beam_size, vocab_size, enc_len = 2, 2, 10, 6
+    ctc_fc = torch.nn.Linear(4, vocab_size)
+    with pytest.raises(ValueError):
+        CTCScorer(ctc_fc, blank_index=0, eos_index=2, dtype=torch.float16)
+
+    # bfloat16 posteriors give the float32 scores, up to rounding
+    enc = torch.rand(batch_size, enc_len, 4)
+    enc_lens = torch.full((batch_size,), enc_len)
+    inp_tokens = torch.ones(batch_size * beam_size, dtype=torch.long)
+    scores = {}
+    for dtype in (torch.float32, torch.bfloat16):
+        scorer = CTCScorer(ctc_fc, blank_index=0, eos_index=2, dtype=dtype)
+        memory = scorer.reset_mem(enc.clone(), enc_lens)
+        scores[dtype], _ = scorer.score(inp_tokens, memory, None, None)
+    expected = scores[torch.float32]
+    actual = scores[torch.bfloat16].float()
+    # the masked tokens are only compared as masked
+    valid = expected > -1e10
+    assert torch.equal(valid, actual > -1e10)
+    assert torch.allclose(actual[valid], expected[valid], atol=1e-2, rtol=1e-2)
+
+
+def test_scorerbuilder_pruned_partial_scorer(pruned_scorer):
+    import torch
+    from speechbrain.decoders.scorer import ScorerBuilder
+
+    beam_size, n_bh, vocab_size, weight = 2, 4, 10, 0.5
+    impl = pruned_scorer(lambda candidates: 0.1 * candidates.float())
+    scorer = ScorerBuilder(partial_scorers=[impl], weights={"pruned": weight})
+    memory = scorer.reset_scorer_mem(None, None)
+    log_probs = torch.randn(n_bh, vocab_size)
+    original = log_probs.clone()
+    inp_tokens = torch.zeros(n_bh, dtype=torch.long)
+    log_probs, _ = scorer.score(inp_tokens, memory, None, log_probs, beam_size)
+
+    # The candidates are the top-k tokens, in any order
+    k = beam_size * scorer.scorer_beam_scale
+    candidates = impl.candidates
+    assert torch.equal(
+        candidates.sort(dim=-1).values,
+        original.topk(k, dim=-1).indices.sort(dim=-1).values,
+    )
+    expected = torch.full_like(original, scorer.minus_inf)
+    expected.scatter_(
+        1,
+        candidates,
+        original.gather(1, candidates) + weight * 0.1 * candidates,
+    )
+    assert torch.allclose(log_probs, expected)
+
+
+def test_scorerbuilder_zero_weight_ctc_masks_blank():
+    import torch
+    from speechbrain.decoders.scorer import (
+        CTCScorer,
+        LengthScorer,
+        ScorerBuilder,
+    )
+
+    beam_size, vocab_size, blank_index = 2, 10, 0
+    ctc_scorer = CTCScorer(
+        ctc_fc=torch.nn.Linear(4, vocab_size),
+        blank_index=blank_index,
+        eos_index=2,
+    )
+    scorer = ScorerBuilder(
+        full_scorers=[ctc_scorer, LengthScorer(vocab_size=vocab_size)],
+        weights={"ctc": 0.0, "length": 1.0},
+    )
+    # The zero-weight CTC scorer is not run, but still blocks the blank
+    assert "ctc" not in scorer.full_scorers
+    memory = scorer.reset_scorer_mem(torch.rand(1, 3, 4), torch.ones(1))
+    log_probs = torch.zeros(beam_size, vocab_size)
+    inp_tokens = torch.zeros(beam_size, dtype=torch.long)
+    log_probs, _ = scorer.score(inp_tokens, memory, None, log_probs, beam_size)
+    assert (log_probs[:, blank_index] <= scorer.minus_inf).all()
+    assert (log_probs[:, blank_index + 1 :] == 1.0).all()
+
+
+def test_scorerbuilder_forwards_attn(register_test_scorer):
+    import torch
+    from speechbrain.decoders.scorer import (
+        BaseScorerInterface,
+        LengthScorer,
+        ScorerBuilder,
+    )
+
+    class AttnScorer(BaseScorerInterface):
+        def score(self, inp_tokens, memory, candidates, attn):
+            self.attn = attn
+            return torch.zeros(inp_tokens.size(0), 1), None
+
+    register_test_scorer("attn", AttnScorer)
+    beam_size, vocab_size = 2, 10
+    impl = AttnScorer()
+    # The attention weights are forwarded to the scorers
+    scorer = ScorerBuilder(
+        full_scorers=[impl, LengthScorer(vocab_size=vocab_size)],
+        weights={"attn": 1.0, "length": 1.0},
+    )
+    memory = scorer.reset_scorer_mem(None, None)
+    attn = torch.rand(beam_size, 3)
+    log_probs = torch.zeros(beam_size, vocab_size)
+    inp_tokens = torch.zeros(beam_size, dtype=torch.long)
+    scorer.score(inp_tokens, memory, attn, log_probs, beam_size)
+    assert impl.attn is attn
+
+
+@pytest.mark.parametrize("dtype", ["float16", "bfloat16"])
+def test_scorerbuilder_half_precision_pruned(dtype, pruned_scorer):
+    import torch
+    from speechbrain.decoders.scorer import ScorerBuilder
+
+    def score_fn(candidates):
+        # -1e20 is out of the float16 range
+        score = torch.zeros(candidates.shape)
+        score[:, 0] = -1e20
+        return score
+
+    beam_size, n_bh, vocab_size = 2, 4, 10
+    dtype = getattr(torch, dtype)
+    impl = pruned_scorer(score_fn)
+    scorer = ScorerBuilder(partial_scorers=[impl], weights={"pruned": 1.0})
+    memory = scorer.reset_scorer_mem(None, None)
+    log_probs = torch.randn(n_bh, vocab_size).to(dtype)
+    inp_tokens = torch.zeros(n_bh, dtype=torch.long)
+    log_probs, _ = scorer.score(inp_tokens, memory, None, log_probs, beam_size)
+
+    assert log_probs.dtype == dtype
+    assert torch.isfinite(log_probs).all()
+    # Candidates never rank below the pruned tokens
+    is_candidate = torch.zeros_like(log_probs, dtype=torch.bool)
+    is_candidate.scatter_(1, impl.candidates, True)
+    pruned = log_probs[~is_candidate]
+    assert (pruned == pruned.min()).all()
+    assert (log_probs[is_candidate] >= pruned.min()).all()
+
+
+def test_kenlm_scorer(monkeypatch):
+    import sys
+    import types
+    import numpy as np
+    import torch
+    from speechbrain.decoders.scorer import KenLMScorer
+
+    class State:
+        def __init__(self):
+            self.history = ()
+
+    class Model:
+        def __init__(self, path):
+            pass
+
+        def BaseScore(self, state, word, out_state):
+            out_state.history = state.history + (word,)
+            return log10_prob(out_state.history)
+
+    def log10_prob(history):
+        return -0.1 * len(history) - 0.01 * (ord(history[-1]) - ord("a"))
+
+    kenlm = types.ModuleType("kenlm")
+    kenlm.State, kenlm.Model = State, Model
+    monkeypatch.setitem(sys.modules, "kenlm", kenlm)
+
+    token_list = ["a", "b", "c", "d", "e"]
+    batch_size, beam_size, vocab_size = 2, 2, len(token_list)
+    n_bh = batch_size * beam_size
+    scorer = KenLMScorer("stub.arpa", vocab_size, token_list)
+    memory = scorer.reset_mem(torch.rand(batch_size, 3, 4), None)
+    inp_tokens = torch.zeros(n_bh, dtype=torch.long)
+
+    # Full vocabulary mode: every token of every hypothesis is scored
+    scores, memory = scorer.score(inp_tokens, memory, None, None)
+    expected = [log10_prob((t,)) / np.log10(np.e) for t in token_list]
+    assert scores.shape == (n_bh, vocab_size)
+    expected = torch.tensor([expected] * n_bh, dtype=torch.float32)
+    assert torch.allclose(scores, expected)
+
+    # The candidates index the beam x vocab scores of each sentence,
+    # e.g. 8 is the token 3 of the hypothesis 1
+    candidates = torch.tensor([[8, 2], [4, 5]])
+    memory = scorer.permute_mem(memory, candidates)
+    assert [s.history for s in memory] == [("d",), ("c",), ("e",), ("a",)]
+
+    # Partial mode: the scores are aligned with the candidates
+    candidates = torch.tensor([[0, 1], [1, 2], [2, 3], [3, 4]])
+    scores, memory = scorer.score(inp_tokens, memory, candidates, None)
+    prefixes = [("d",), ("c",), ("e",), ("a",)]
+    expected = [
+        [log10_prob(prefix + (token_list[t],)) / np.log10(np.e) for t in row]
+        for prefix, row in zip(prefixes, candidates.tolist())
+    ]
+    assert torch.allclose(scores, torch.tensor(expected, dtype=torch.float32))
+
+    # A token that was not a candidate has no state
+    candidates = torch.tensor([[0, 4], [9, 0]])
+    memory = scorer.permute_mem(memory, candidates)
+    assert memory[0].history == ("d", "a")
+    assert memory[1] is None
+    assert memory[2].history == ("a", "e")
+    assert memory[3] is None
+
+    # The hypotheses without state are not scored
+    scores, _ = scorer.score(inp_tokens, memory, None, None)
+    assert (scores[[1, 3]] == scorer.minus_inf).all()
+    assert (scores[[0, 2]] > scorer.minus_inf).all()